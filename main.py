@@ -3,6 +3,7 @@
 
 Omi会話データをGitHubリポジトリに自動保存する日記アプリです。
 毎日の日記がMarkdownファイルとして保存されます！
+Python 3.11以上で動作します。
 
 改善点:
 - 日時変換の共通化
@@ -13,19 +14,31 @@ Omi会話データをGitHubリポジトリに自動保存する日記アプリ
 """
 
 import os
-import base64
-import json
+import sys
+import asyncio
+import gzip
+import hashlib
+import hmac
 import logging
-from datetime import datetime, timezone
-from zoneinfo import ZoneInfo  # Python 3.9+ 標準ライブラリ
-from typing import Optional, Dict, Any
-from dataclasses import dataclass
+from datetime import date as _date, datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+from typing import Optional, Dict, Any, List, Mapping, Sequence, Tuple
+from types import MappingProxyType
+from dataclasses import dataclass, field
 from functools import lru_cache
+from collections import OrderedDict
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, Request, Query, Depends, HTTPException
-from fastapi.responses import JSONResponse, HTMLResponse
+from fastapi.responses import JSONResponse, HTMLResponse, Response
+from fastapi.middleware.gzip import GZipMiddleware
 import httpx
+import orjson
+import pybase64
+
+# fromisoformatが末尾のZを解釈できないと、日時がすべて現在時刻で保存されてしまう
+if sys.version_info < (3, 11):
+    raise RuntimeError("Python 3.11以上が必要です")
 
 # ============================================
 # 設定管理
@@ -39,10 +52,12 @@ class Config:
     github_branch: str = "main"
     github_api_url: str = "https://api.github.com"
     timezone: str = "Asia/Tokyo"
+    cron_secret: str = ""
+    is_configured: bool = field(init=False, repr=False, compare=False)
     
-    @property
-    def is_configured(self) -> bool:
-        return bool(self.github_token and self.github_repo)
+    def __post_init__(self):
+        # 設定は不変なので、判定は生成時に一度だけ行う
+        object.__setattr__(self, "is_configured", bool(self.github_token and self.github_repo))
     
     @classmethod
     def from_env(cls) -> "Config":
@@ -50,6 +65,7 @@ class Config:
             github_token=os.getenv("GITHUB_TOKEN", ""),
             github_repo=os.getenv("GITHUB_REPO", ""),
             github_branch=os.getenv("GITHUB_BRANCH", "main"),
+            cron_secret=os.getenv("CRON_SECRET", ""),
         )
 
 
@@ -71,15 +87,21 @@ logger = logging.getLogger(__name__)
 # カテゴリアイコン定数
 # ============================================
 
-CATEGORY_ICONS: Dict[str, str] = {
+CATEGORY_ICONS: Mapping[str, str] = MappingProxyType({
     "personal": "👤", "education": "📚", "health": "🏥", "finance": "💰",
     "legal": "⚖️", "philosophy": "🤔", "spiritual": "🙏", "science": "🔬",
     "technology": "💻", "business": "💼", "social": "👥", "travel": "✈️",
     "food": "🍽️", "entertainment": "🎬", "sports": "⚽", "politics": "🏛️",
     "other": "💬"
-}
+})
+
+WEEKDAY_JA = ("月", "火", "水", "木", "金", "土", "日")
 
-WEEKDAY_JA = ["月", "火", "水", "木", "金", "土", "日"]
+# webhookで受け付けるリクエストボディの最大サイズ（バイト）
+MAX_WEBHOOK_BODY_SIZE = 5_000_000
+
+# 定期実行で再生成する日数（前日から遡る。日付が変わった後に届いた会話も拾う）
+CRON_CONSOLIDATE_DAYS = 2
 
 
 # ============================================
@@ -91,18 +113,29 @@ class DateTimeHelper:
     
     def __init__(self, tz_name: str = "Asia/Tokyo"):
         self.tz = ZoneInfo(tz_name)
+        # 夏時間のないタイムゾーン（Asia/Tokyoなど）は固定オフセットで変換し、
+        # tzデータベースの参照を省く
+        self._local_tz = self._fixed_offset(self.tz) or self.tz
+    
+    @staticmethod
+    def _fixed_offset(tz: ZoneInfo) -> Optional[timezone]:
+        """年間を通じてUTCオフセットが一定なら固定オフセットを返す"""
+        year = datetime.now(timezone.utc).year
+        offsets = {datetime(year, month, 1, tzinfo=tz).utcoffset() for month in (1, 7)}
+        if len(offsets) == 1:
+            return timezone(offsets.pop())
+        return None
     
     def parse_iso(self, iso_string: str) -> datetime:
-        """ISO形式の日時文字列をパース"""
+        """ISO形式の日時文字列をパース（3.11以降のfromisoformatは末尾のZもそのまま解釈できる）"""
         try:
-            dt = datetime.fromisoformat(iso_string.replace("Z", "+00:00"))
-            return dt.astimezone(self.tz)
+            return datetime.fromisoformat(iso_string).astimezone(self._local_tz)
         except (ValueError, TypeError):
-            return datetime.now(self.tz)
+            return self.now()
     
     def now(self) -> datetime:
         """現在時刻を取得"""
-        return datetime.now(self.tz)
+        return datetime.now(self._local_tz)
     
     def format_date(self, dt: datetime) -> str:
         """日付をYYYY-MM-DD形式でフォーマット"""
@@ -116,10 +149,10 @@ class DateTimeHelper:
         """日時をフルフォーマット"""
         return dt.strftime("%Y-%m-%d %H:%M:%S")
     
-    def format_date_ja(self, dt: datetime) -> str:
+    @staticmethod
+    def format_date_ja(dt: _date) -> str:
         """日付を日本語形式でフォーマット"""
-        weekday = WEEKDAY_JA[dt.weekday()]
-        return dt.strftime(f"%Y年%m月%d日（{weekday}）")
+        return f"{dt.year:04d}年{dt.month:02d}月{dt.day:02d}日（{WEEKDAY_JA[dt.weekday()]}）"
 
 
 # ============================================
@@ -130,117 +163,413 @@ class PathGenerator:
     """ファイルパス生成"""
     
     @staticmethod
-    def _date_parts(date: str) -> tuple:
-        """日付を年/月/日に分割"""
-        return tuple(date.split("-"))
+    def diary(date: str) -> str:
+        """日記ファイルパス（date は YYYY-MM-DD）"""
+        return f"diary/{date[0:4]}/{date[5:7]}/{date[8:10]}.md"
+    
+    @staticmethod
+    def transcript(date: str) -> str:
+        """STT生テキストファイルパス"""
+        return f"diary/{date[0:4]}/{date[5:7]}/{date[8:10]}_transcript.md"
+    
+    @staticmethod
+    def day_dir(date: str) -> str:
+        """日付ごとのディレクトリ（エントリ・生データを格納）"""
+        return f"diary/{date[0:4]}/{date[5:7]}/{date[8:10]}"
     
     @classmethod
-    def diary(cls, date: str) -> str:
-        """日記ファイルパス"""
-        year, month, day = cls._date_parts(date)
-        return f"diary/{year}/{month}/{day}.md"
+    def diary_entry(cls, date: str, name: str) -> str:
+        """会話ごとの日記エントリファイルパス"""
+        return f"{cls.day_dir(date)}/entries/{name}.md"
     
     @classmethod
-    def transcript(cls, date: str) -> str:
-        """STT生テキストファイルパス"""
-        year, month, day = cls._date_parts(date)
-        return f"diary/{year}/{month}/{day}_transcript.md"
+    def transcript_entry(cls, date: str, name: str) -> str:
+        """会話ごとのSTT生テキストファイルパス"""
+        return f"{cls.day_dir(date)}/transcripts/{name}.md"
+    
+    @classmethod
+    def rendered(cls, date: str) -> str:
+        """日ごとのファイルをどのエントリから組み立てたかの一覧"""
+        return f"{cls.day_dir(date)}/rendered.json"
     
     @classmethod
     def raw_data(cls, date: str, conversation_id: str) -> str:
         """生データJSONファイルパス"""
-        year, month, day = cls._date_parts(date)
-        return f"diary/{year}/{month}/{day}/raw/{conversation_id}.json"
+        return f"{cls.day_dir(date)}/raw/{conversation_id}.json"
 
 
 # ============================================
 # GitHub APIクライアント
 # ============================================
 
+@dataclass
+class CachedFile:
+    """取得済みファイルのキャッシュ（ETagによる条件付きGET用）"""
+    content: str
+    sha: str
+    etag: Optional[str]
+
+
+class FileCache:
+    """パス -> 取得済みファイルのLRUキャッシュ（合計文字数で上限を設ける）
+    
+    任意の日付の日記を読めるので、上限がないとプロセスが読んだファイルが全部残る。
+    """
+    
+    def __init__(self, max_chars: int = 8_000_000):
+        self.max_chars = max_chars
+        self._size = 0
+        self._data: "OrderedDict[str, CachedFile]" = OrderedDict()
+    
+    def get(self, path: str) -> Optional[CachedFile]:
+        cached = self._data.get(path)
+        if cached is not None:
+            self._data.move_to_end(path)
+        return cached
+    
+    def put(self, path: str, cached: CachedFile):
+        self.pop(path)
+        if len(cached.content) > self.max_chars:
+            return
+        self._data[path] = cached
+        self._size += len(cached.content)
+        while self._size > self.max_chars:
+            _, evicted = self._data.popitem(last=False)
+            self._size -= len(evicted.content)
+    
+    def pop(self, path: str):
+        cached = self._data.pop(path, None)
+        if cached is not None:
+            self._size -= len(cached.content)
+
+
+# パス -> 最新のファイル内容（プロセス内キャッシュ）
+_file_cache = FileCache()
+
+
+class BlobCache:
+    """blob SHA -> テキストのLRUキャッシュ（合計文字数で上限を設ける）
+    
+    blobはSHAで内容が決まり変更されないので、無効化は不要。
+    """
+    
+    def __init__(self, max_chars: int = 8_000_000):
+        self.max_chars = max_chars
+        self._size = 0
+        self._data: "OrderedDict[str, str]" = OrderedDict()
+    
+    def get(self, sha: str) -> Optional[str]:
+        text = self._data.get(sha)
+        if text is not None:
+            self._data.move_to_end(sha)
+        return text
+    
+    def put(self, sha: str, text: str):
+        if sha in self._data or len(text) > self.max_chars:
+            return
+        self._data[sha] = text
+        self._size += len(text)
+        while self._size > self.max_chars:
+            _, evicted = self._data.popitem(last=False)
+            self._size -= len(evicted)
+
+
+_blob_cache = BlobCache()
+
+# ブランチ -> 最後に確認した先頭の（コミットSHA, ツリーSHA）
+_head_cache: Dict[str, Tuple[str, str]] = {}
+
+# GitHubのセカンダリレート制限を超えないよう同時リクエスト数を制限
+MAX_CONCURRENT_REQUESTS = 5
+
+# orjsonで直列化したリクエストボディのヘッダー
+_JSON_CONTENT_TYPE = {"Content-Type": "application/json"}
+
+# blobを生のバイト列で受け取るためのAcceptヘッダー
+_RAW_ACCEPT = {"Accept": "application/vnd.github.raw+json"}
+
+# 応答前に切断された場合の再試行回数
+MAX_TRANSIENT_RETRIES = 2
+
+# レート制限時に待機する最大秒数（これより長い場合は待たずに返す）
+MAX_RATE_LIMIT_WAIT = 60.0
+
+
+class GitHubConflictError(Exception):
+    """ブランチが他のコミットで先に更新された"""
+
+
+@lru_cache()
+def github_headers(config: Config) -> Dict[str, str]:
+    """GitHub APIリクエストヘッダー（設定ごとに1回だけ生成）"""
+    return {
+        "Authorization": f"Bearer {config.github_token}",
+        "Accept": "application/vnd.github+json",
+        "X-GitHub-Api-Version": "2022-11-28"
+    }
+
+
+def create_http_client(config: Config) -> httpx.AsyncClient:
+    """GitHub API用の共有HTTPクライアントを生成
+    
+    HTTP/2で1本の接続に複数リクエストを多重化する（h2が必要）。
+    transportを渡すとclient側のhttp2/limitsは無視されるのでtransportに指定する。
+    """
+    transport = httpx.AsyncHTTPTransport(
+        http2=True,
+        limits=httpx.Limits(max_connections=10, max_keepalive_connections=10, keepalive_expiry=60.0),
+        retries=2  # 接続確立の失敗は自動で再試行
+    )
+    return httpx.AsyncClient(
+        base_url=config.github_api_url,
+        headers=github_headers(config),
+        timeout=httpx.Timeout(10.0, connect=3.0),
+        transport=transport
+    )
+
+
 class GitHubClient:
     """GitHub API操作クラス"""
     
-    def __init__(self, config: Config):
+    def __init__(self, config: Config, client: Optional[httpx.AsyncClient] = None):
         self.config = config
-        self._client: Optional[httpx.AsyncClient] = None
-    
-    @property
-    def headers(self) -> Dict[str, str]:
-        return {
-            "Authorization": f"Bearer {self.config.github_token}",
-            "Accept": "application/vnd.github+json",
-            "X-GitHub-Api-Version": "2022-11-28"
-        }
+        self._client = client
+        # 共有クライアントを渡された場合はクローズしない
+        self._owns_client = client is None
+        # asyncioのプリミティブはイベントループの中で生成する（lifespanか最初のリクエスト）
+        self._semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
     
     async def _get_client(self) -> httpx.AsyncClient:
         """HTTPクライアントを取得（再利用）"""
         if self._client is None or self._client.is_closed:
-            self._client = httpx.AsyncClient(
-                headers=self.headers,
-                timeout=30.0
-            )
+            self._client = create_http_client(self.config)
+            self._owns_client = True
         return self._client
     
     async def close(self):
-        """クライアントをクローズ"""
-        if self._client and not self._client.is_closed:
+        """クライアントをクローズ（自前で生成した場合のみ）"""
+        if self._owns_client and self._client and not self._client.is_closed:
             await self._client.aclose()
     
-    async def get_file(self, path: str) -> Optional[Dict[str, Any]]:
-        """ファイル内容を取得"""
+    @staticmethod
+    def _rate_limit_wait(response: httpx.Response) -> Optional[float]:
+        """レート制限で拒否された場合の待機秒数（制限以外の403はNone）"""
+        retry_after = response.headers.get("retry-after")
+        if retry_after is not None:
+            try:
+                return float(retry_after)
+            except ValueError:
+                return None
+        if response.headers.get("x-ratelimit-remaining") == "0":
+            reset = response.headers.get("x-ratelimit-reset")
+            if reset and reset.isdigit():
+                return max(0.0, int(reset) - datetime.now(timezone.utc).timestamp())
+        return None
+    
+    async def _send(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """リクエストを送信（送信後の切断は再試行）
+        
+        接続確立の失敗はtransportが再試行する。GitHub APIへの書き込みは
+        blob・ツリーがSHAで冪等、refの更新も同じSHAなら冪等なので、
+        応答前に切断された場合はメソッドによらず送り直す。
+        """
         client = await self._get_client()
-        url = f"{self.config.github_api_url}/repos/{self.config.github_repo}/contents/{path}"
+        for attempt in range(MAX_TRANSIENT_RETRIES + 1):
+            try:
+                async with self._semaphore:
+                    return await client.request(method, url, **kwargs)
+            except (httpx.ReadError, httpx.RemoteProtocolError) as e:
+                if attempt == MAX_TRANSIENT_RETRIES:
+                    raise
+                logger.warning(f"GitHub connection dropped on {method} {url}, retrying: {e!r}")
+                await asyncio.sleep(0.5 * (attempt + 1))
+    
+    async def _request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """GitHub APIリクエスト（同時実行数を制限し、レート制限時は1回だけ待って再試行）"""
+        if "json" in kwargs:
+            # httpxのjson=は標準のjsonでASCIIエスケープするので、UTF-8のままorjsonで送る
+            kwargs["content"] = orjson.dumps(kwargs.pop("json"))
+            kwargs["headers"] = {**kwargs.get("headers", {}), **_JSON_CONTENT_TYPE}
+        for attempt in range(2):
+            response = await self._send(method, url, **kwargs)
+            if response.status_code not in (403, 429) or attempt:
+                break
+            wait = self._rate_limit_wait(response)
+            if wait is None or wait > MAX_RATE_LIMIT_WAIT:
+                break
+            logger.warning(f"GitHub rate limited on {method} {url}, retrying in {wait:.1f}s")
+            await asyncio.sleep(wait)
+        return response
+    
+    async def get_file(self, path: str) -> Optional[Dict[str, Any]]:
+        """ファイル内容を取得（ETagが一致すればキャッシュを返す、存在しなければNone）"""
+        cached = _file_cache.get(path)
+        url = f"/repos/{self.config.github_repo}/contents/{path}"
+        headers = {"If-None-Match": cached.etag} if cached and cached.etag else {}
         
         try:
-            response = await client.get(url, params={"ref": self.config.github_branch})
-            if response.status_code == 200:
-                data = response.json()
-                return {
-                    "content": base64.b64decode(data["content"]).decode("utf-8"),
-                    "sha": data["sha"]
-                }
-            elif response.status_code == 404:
-                return None
-            else:
-                logger.warning(f"GitHub API error: {response.status_code} for {path}")
+            response = await self._request(
+                "GET", url, params={"ref": self.config.github_branch}, headers=headers
+            )
+            if response.status_code == 304 and cached:
+                return {"content": cached.content, "sha": cached.sha}
+            if response.status_code == 404:
+                _file_cache.pop(path)
                 return None
+            response.raise_for_status()
+            data = response.json()
+            content = pybase64.b64decode(data["content"]).decode("utf-8")
+            _file_cache.put(path, CachedFile(content, data["sha"], response.headers.get("etag")))
+            return {"content": content, "sha": data["sha"]}
         except httpx.HTTPError as e:
+            # 取得失敗を「ファイルなし」と区別できるよう、404以外は呼び出し側に伝える
             logger.error(f"HTTP error getting file {path}: {e}")
-            return None
+            raise
     
-    async def put_file(
-        self, 
-        path: str, 
-        content: str, 
-        message: str, 
-        sha: Optional[str] = None
-    ) -> Dict[str, Any]:
-        """ファイルを作成または更新"""
-        client = await self._get_client()
-        url = f"{self.config.github_api_url}/repos/{self.config.github_repo}/contents/{path}"
+    async def create_blob(self, text: str) -> str:
+        """テキストのblobを作成してSHAを返す（base64を介さずUTF-8のまま送信）"""
+        url = f"/repos/{self.config.github_repo}/git/blobs"
         
-        data = {
-            "message": message,
-            "content": base64.b64encode(content.encode("utf-8")).decode("utf-8"),
-            "branch": self.config.github_branch
-        }
-        if sha:
-            data["sha"] = sha
+        response = await self._request("POST", url, json={"content": text, "encoding": "utf-8"})
+        response.raise_for_status()
+        return response.json()["sha"]
+    
+    async def get_blob(self, sha: str) -> str:
+        """blobの内容をテキストとして取得（取得済み・書き込み済みのblobはキャッシュから返す）
+        
+        rawメディアタイプで受け取り、base64のJSONを経由せずにUTF-8を1回デコードするだけにする。
+        """
+        cached = _blob_cache.get(sha)
+        if cached is not None:
+            return cached
+        
+        url = f"/repos/{self.config.github_repo}/git/blobs/{sha}"
+        response = await self._request("GET", url, headers=_RAW_ACCEPT)
+        response.raise_for_status()
+        text = response.content.decode("utf-8")
+        _blob_cache.put(sha, text)
+        return text
+    
+    async def list_tree(self, path: str) -> List[Dict[str, Any]]:
+        """ディレクトリ以下のツリーを再帰的に取得（存在しなければ空）
+        
+        返すエントリのpathは指定ディレクトリからの相対パス。
+        """
+        repo_url = f"/repos/{self.config.github_repo}"
+        parent, _, name = path.rpartition("/")
+        
+        # 親ディレクトリの一覧から対象ディレクトリのツリーSHAを引く
+        response = await self._request(
+            "GET", f"{repo_url}/contents/{parent}", params={"ref": self.config.github_branch}
+        )
+        if response.status_code == 404:
+            return []
+        response.raise_for_status()
+        tree_sha = next(
+            (item["sha"] for item in response.json() if item["name"] == name and item["type"] == "dir"),
+            None
+        )
+        if tree_sha is None:
+            return []
+        
+        response = await self._request(
+            "GET", f"{repo_url}/git/trees/{tree_sha}", params={"recursive": "1"}
+        )
+        response.raise_for_status()
+        return response.json()["tree"]
+    
+    async def _get_head(self) -> Tuple[str, str]:
+        """ブランチ先頭のコミットSHAとツリーSHAを取得
+        
+        直前のコミットで分かっている先頭があればAPIを呼ばずに使う。
+        古かった場合はref更新が失敗するので、そこでキャッシュを捨てる。
+        ブランチAPIはコミットのツリーSHAも返すので、ref→コミットの2往復が1回で済む。
+        """
+        cached = _head_cache.get(self.config.github_branch)
+        if cached:
+            return cached
+        
+        response = await self._request(
+            "GET", f"/repos/{self.config.github_repo}/branches/{self.config.github_branch}"
+        )
+        response.raise_for_status()
+        commit = response.json()["commit"]
+        return commit["sha"], commit["commit"]["tree"]["sha"]
+    
+    async def batch_commit(
+        self,
+        files: List[Tuple[str, str]],
+        message: str,
+        cached_paths: Sequence[str] = ()
+    ) -> str:
+        """複数のテキストファイルを1コミットで書き込み（Git Data API）
+        
+        blob作成とブランチ先頭の取得は並列に行う。ブランチが先に
+        更新されていた（キャッシュした先頭が古かった）場合は
+        GitHubConflictErrorを送出する。
+        ツリーが変わらなければコミットせず、先頭のコミットSHAをそのまま返す。
+        cached_pathsに含まれるパスは後で読み直すので、書き込んだ内容をblobキャッシュに入れる。
+        """
+        repo_url = f"/repos/{self.config.github_repo}"
         
         try:
-            response = await client.put(url, json=data)
-            return response.json()
-        except httpx.HTTPError as e:
-            logger.error(f"HTTP error putting file {path}: {e}")
+            *blob_shas, (parent_sha, base_tree) = await asyncio.gather(
+                *(self.create_blob(content) for _, content in files),
+                self._get_head()
+            )
+            
+            tree = [
+                {"path": path, "mode": "100644", "type": "blob", "sha": blob_sha}
+                for (path, _), blob_sha in zip(files, blob_shas)
+            ]
+            response = await self._request(
+                "POST", f"{repo_url}/git/trees", json={"base_tree": base_tree, "tree": tree}
+            )
+            response.raise_for_status()
+            tree_sha = response.json()["sha"]
+            if tree_sha == base_tree:
+                # 内容が変わっていなければ空のコミットは作らない
+                logger.info(f"No changes, skipping commit: {message}")
+                _head_cache[self.config.github_branch] = (parent_sha, tree_sha)
+                return parent_sha
+            
+            response = await self._request(
+                "POST", f"{repo_url}/git/commits",
+                json={"message": message, "tree": tree_sha, "parents": [parent_sha]}
+            )
+            response.raise_for_status()
+            commit_sha = response.json()["sha"]
+            
+            response = await self._request(
+                "PATCH", f"{repo_url}/git/refs/heads/{self.config.github_branch}",
+                json={"sha": commit_sha}
+            )
+            if response.status_code in (409, 422):
+                raise GitHubConflictError(f"{self.config.github_branch} was updated concurrently")
+            response.raise_for_status()
+        except (httpx.HTTPError, GitHubConflictError) as e:
+            # 先頭のキャッシュが古いだけなら呼び出し側で再試行するので警告に留める
+            log = logger.warning if isinstance(e, GitHubConflictError) else logger.error
+            log(f"Error committing {[path for path, _ in files]}: {e}")
+            _head_cache.pop(self.config.github_branch, None)
+            for path, _ in files:
+                _file_cache.pop(path)
             raise
+        
+        _head_cache[self.config.github_branch] = (commit_sha, tree_sha)
+        for (path, content), blob_sha in zip(files, blob_shas):
+            # 内容が変わったのでETagも無効
+            _file_cache.pop(path)
+            if path in cached_paths:
+                _blob_cache.put(blob_sha, content)
+        return commit_sha
     
     async def get_repo_info(self) -> Optional[Dict[str, Any]]:
         """リポジトリ情報を取得"""
-        client = await self._get_client()
-        url = f"{self.config.github_api_url}/repos/{self.config.github_repo}"
+        url = f"/repos/{self.config.github_repo}"
         
         try:
-            response = await client.get(url)
+            response = await self._request("GET", url)
             if response.status_code == 200:
                 return response.json()
             return None
@@ -253,6 +582,18 @@ class GitHubClient:
 # コンテンツ生成
 # ============================================
 
+@lru_cache(maxsize=128)
+def _diary_header_for(date: str) -> str:
+    """日記ファイルのヘッダー（同じ日付は何度も使うのでキャッシュ）"""
+    try:
+        # strptimeより高速なC実装のfromisoformatで解釈
+        formatted = DateTimeHelper.format_date_ja(_date.fromisoformat(date))
+    except ValueError:
+        formatted = date
+    
+    return f"# 📔 {formatted} の日記\n\n---\n\n"
+
+
 class ContentGenerator:
     """Markdownコンテンツ生成"""
     
@@ -261,13 +602,7 @@ class ContentGenerator:
     
     def diary_header(self, date: str) -> str:
         """日記ファイルのヘッダー"""
-        try:
-            dt = datetime.strptime(date, "%Y-%m-%d")
-            formatted = self.dt_helper.format_date_ja(dt)
-        except ValueError:
-            formatted = date
-        
-        return f"# 📔 {formatted} の日記\n\n---\n\n"
+        return _diary_header_for(date)
     
     def diary_entry(self, conversation: Dict[str, Any]) -> str:
         """日記エントリを生成"""
@@ -289,25 +624,28 @@ class ContentGenerator:
         # トランスクリプト有無
         has_transcript = bool(conversation.get("transcript_segments"))
         
-        entry = f"\n### {icon} {title}\n\n"
-        entry += f"**時間**: {time_str}  \n"
-        entry += f"**カテゴリ**: {category}\n"
+        parts = [
+            f"\n### {icon} {title}\n\n",
+            f"**時間**: {time_str}  \n",
+            f"**カテゴリ**: {category}\n",
+        ]
         
         if has_transcript and conversation_id:
-            entry += f"**📝 STT生テキスト**: [詳細を見る](#stt-{conversation_id[:8]})\n"
+            parts.append(f"**📝 STT生テキスト**: [詳細を見る](#stt-{conversation_id[:8]})\n")
         
-        entry += f"\n{overview}\n"
+        parts.append(f"\n{overview}\n")
         
         # アクションアイテム
         action_items = structured.get("action_items", [])
         if action_items:
-            entry += "\n**📋 アクションアイテム**:\n"
-            for item in action_items[:5]:
-                desc = item.get("description", "") if isinstance(item, dict) else str(item)
-                entry += f"- [ ] {desc}\n"
+            parts.append("\n**📋 アクションアイテム**:\n")
+            parts.extend(
+                f"- [ ] {item.get('description', '') if isinstance(item, dict) else item}\n"
+                for item in action_items[:5]
+            )
         
-        entry += "\n---\n"
-        return entry
+        parts.append("\n---\n")
+        return "".join(parts)
     
     def transcript_header(self, date: str) -> str:
         """STT生テキストファイルのヘッダー"""
@@ -323,26 +661,29 @@ class ContentGenerator:
         dt = self.dt_helper.parse_iso(created_at) if created_at else self.dt_helper.now()
         time_str = self.dt_helper.format_datetime(dt)
         
-        entry = f"\n## 📝 {title} - {conversation_id}\n\n"
-        entry += f"**記録時間**: {time_str}\n\n"
-        entry += "### STT生テキスト\n\n"
+        parts = [
+            f"\n## 📝 {title} - {conversation_id}\n\n",
+            f"**記録時間**: {time_str}\n\n",
+            "### STT生テキスト\n\n",
+        ]
         
         segments = conversation.get("transcript_segments", [])
         if segments:
-            for seg in segments:
-                text = seg.get("text", "").strip()
-                speaker = seg.get("speaker", "SPEAKER_00")
-                start = int(seg.get("start", 0))
-                end = int(seg.get("end", 0))
-                is_user = seg.get("is_user", False)
-                
-                label = "👤 あなた" if is_user else f"🎤 {speaker}"
-                entry += f"{label} [{start}s - {end}s]\n{text}\n\n"
+            parts.extend(self._segment_text(seg) for seg in segments)
         else:
-            entry += "*STTデータがありません*\n\n"
+            parts.append("*STTデータがありません*\n\n")
         
-        entry += "\n---\n\n"
-        return entry
+        parts.append("\n---\n\n")
+        return "".join(parts)
+    
+    @staticmethod
+    def _segment_text(seg: Dict[str, Any]) -> str:
+        """STTセグメント1件分のテキスト"""
+        text = seg.get("text", "").strip()
+        start = int(seg.get("start", 0))
+        end = int(seg.get("end", 0))
+        label = "👤 あなた" if seg.get("is_user", False) else f"🎤 {seg.get('speaker', 'SPEAKER_00')}"
+        return f"{label} [{start}s - {end}s]\n{text}\n\n"
 
 
 # ============================================
@@ -350,77 +691,239 @@ class ContentGenerator:
 # ============================================
 
 class DiaryService:
-    """日記保存サービス"""
+    """日記保存サービス
+    
+    会話ごとにエントリファイルを書き込み、日ごとの日記（DD.md）と
+    STT生テキスト（DD_transcript.md）はconsolidateでまとめて再生成する。
+    日ごとのファイルを毎回読み直して追記しないので、1回の保存で
+    送るのはその会話の分だけになる。
+    """
+    
+    # 日ごとのファイルにしかなかった内容を移すエントリ名（時刻順の並びで必ず先頭に来る）
+    LEGACY_ENTRY_NAME = "000000-legacy"
     
     def __init__(self, github: GitHubClient, generator: ContentGenerator):
         self.github = github
         self.generator = generator
+        # 同一プロセス内のコミットは順番に行う（ブランチ更新の競合を防ぐ）
+        self._commit_lock = asyncio.Lock()
     
-    async def save_or_append(
+    async def _commit(
         self,
-        path: str,
-        content: str,
-        header: str,
-        commit_message_new: str,
-        commit_message_update: str
+        files: List[Tuple[str, str]],
+        message: str,
+        cached_paths: Sequence[str] = ()
     ) -> str:
-        """ファイルを新規作成または追記"""
-        existing = await self.github.get_file(path)
-        
-        if existing:
-            new_content = existing["content"] + "\n" + content
-            await self.github.put_file(path, new_content, commit_message_update, existing["sha"])
-            return "updated"
-        else:
-            new_content = header + content
-            await self.github.put_file(path, new_content, commit_message_new)
-            return "created"
+        """コミット（他のコミットと競合したら1回だけやり直す）"""
+        async with self._commit_lock:
+            try:
+                return await self.github.batch_commit(files, message, cached_paths)
+            except GitHubConflictError:
+                logger.warning(f"Branch updated concurrently, retrying commit: {message}")
+                return await self.github.batch_commit(files, message, cached_paths)
+    
+    @staticmethod
+    def dump_raw_data(conversation: Dict[str, Any]) -> str:
+        """生データJSON（インデント付き、UTF-8テキストのblobとして送るのでstrで返す）"""
+        return orjson.dumps(
+            conversation, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS, default=str
+        ).decode("utf-8")
     
     async def save_conversation(self, conversation: Dict[str, Any], date: str) -> Dict[str, Any]:
-        """会話を保存"""
-        config = get_config()
+        """会話を保存（日記・STT生テキスト・生データのエントリを1コミットで書き込む）"""
         conversation_id = conversation.get("id", "")
         transcript_segments = conversation.get("transcript_segments", [])
         
+        # 1. 日記
+        diary_md = self.generator.diary_entry(conversation)
+        
+        # 2. STT生テキスト
+        # STT生テキストと生データJSONは会話が長いとCPUを使うので、
+        # イベントループを止めないよう別スレッドで生成する
+        transcript_md = None
+        if transcript_segments:
+            transcript_md = await asyncio.to_thread(self.generator.transcript_entry, conversation)
+        
+        # エントリ名は時刻を先頭に付けて、一覧の並びが時系列になるようにする
+        # IDのない会話は内容のハッシュを付け、同じ秒の別の会話で上書きしないようにする
+        dt_helper = self.generator.dt_helper
+        created_at = conversation.get("created_at", "")
+        dt = dt_helper.parse_iso(created_at) if created_at else dt_helper.now()
+        suffix = conversation_id
+        if not suffix:
+            suffix = hashlib.sha1(f"{diary_md}{transcript_md or ''}".encode("utf-8")).hexdigest()[:8]
+        name = f"{dt.strftime('%H%M%S')}_{suffix}"
+        
         result = {
             "date": date,
-            "diary_path": PathGenerator.diary(date),
+            "diary_path": PathGenerator.diary_entry(date, name),
             "transcript_path": None,
             "raw_data_path": None,
         }
+        files = [(result["diary_path"], diary_md)]
+        if transcript_md is not None:
+            result["transcript_path"] = PathGenerator.transcript_entry(date, name)
+            files.append((result["transcript_path"], transcript_md))
+        
+        # 3. 生データJSON
+        if conversation_id:
+            result["raw_data_path"] = PathGenerator.raw_data(date, conversation_id)
+            raw_json = await asyncio.to_thread(self.dump_raw_data, conversation)
+            files.append((result["raw_data_path"], raw_json))
         
-        # 1. 日記を保存
-        diary_entry = self.generator.diary_entry(conversation)
-        await self.save_or_append(
-            path=result["diary_path"],
-            content=diary_entry,
-            header=self.generator.diary_header(date),
-            commit_message_new=f"📔 {date} の日記を作成",
-            commit_message_update=f"📝 {date} の日記を更新"
+        message = f"📝 {date} の日記を追加"
+        if conversation_id:
+            message += f": {conversation_id[:8]}"
+        # エントリはconsolidateで読み直すので、書き込んだ内容をキャッシュしておく
+        entry_paths = [p for p in (result["diary_path"], result["transcript_path"]) if p]
+        await self._commit(files, message, cached_paths=entry_paths)
+        
+        return result
+    
+    @staticmethod
+    def _legacy_part(
+        existing: Optional[Dict[str, Any]],
+        header: str,
+        entries: Sequence[str],
+        stale: Sequence[str] = ()
+    ) -> Optional[str]:
+        """既存の日ごとファイルのうち、どのエントリにも含まれない部分
+        
+        エントリ方式にする前に追記された分や、GitHub上で直接書き足された分がこれに当たる。
+        再生成で消えないよう、呼び出し側でエントリとして保存し直す。
+        staleは前回の再生成後に書き換えられたエントリの古い内容で、これも取り除く。
+        """
+        if not existing:
+            return None
+        body = existing["content"]
+        if body.startswith(header):
+            body = body[len(header):]
+        for entry in (*entries, *stale):
+            body = body.replace(entry, "", 1)
+        body = body.strip("\n")
+        # エントリと同じく前後に改行を付け、旧方式の追記と同じ並びにする
+        return f"\n{body}\n" if body.strip() else None
+    
+    def _rebuild_daily(
+        self,
+        path: str,
+        header: str,
+        entries: List[Tuple[str, str]],
+        existing: Optional[Dict[str, Any]],
+        legacy_path: str,
+        files: List[Tuple[str, str]],
+        stale: Sequence[str] = ()
+    ) -> str:
+        """日ごとのファイルをエントリから組み立て、変更があればfilesに追加して内容を返す
+        
+        entriesは（パス, 内容）の時系列順。既存ファイルにしかない部分は
+        legacy_pathのエントリに移してから組み立てる。
+        """
+        contents = [content for _, content in entries]
+        legacy = self._legacy_part(existing, header, contents, stale)
+        if legacy:
+            logger.info(f"Moving content found only in {path} to {legacy_path}")
+            if entries and entries[0][0] == legacy_path:
+                # 移行済みのエントリがあれば、新しく見つかった分を後ろに足す
+                legacy = contents[0] + legacy
+                contents[0] = legacy
+            else:
+                contents.insert(0, legacy)
+            files.append((legacy_path, legacy))
+        
+        content = header + "\n".join(contents)
+        if existing is None or existing["content"] != content:
+            files.append((path, content))
+        return content
+    
+    async def consolidate(self, date: str, commit: bool = True) -> Optional[Dict[str, Any]]:
+        """その日のエントリから日記とSTT生テキストを再生成（エントリがなければNone）
+        
+        commit=Falseなら日記だけを組み立てて返し、書き込まない（STT生テキストは読まない）。
+        rendered.jsonの一覧がいまのエントリと一致すれば、日記ファイルをそのまま返す。
+        既存の日ごとファイルにしかない内容はエントリに移して残す。
+        前回の再生成に使ったエントリのblob SHAをrendered.jsonに残しておき、
+        その後に書き換えられたエントリの古い内容は移さずに捨てる。
+        内容が変わらなければコミットしない。
+        """
+        diary_path = PathGenerator.diary(date)
+        transcript_path = PathGenerator.transcript(date)
+        rendered_path = PathGenerator.rendered(date)
+        reads = [
+            self.github.list_tree(PathGenerator.day_dir(date)),
+            self.github.get_file(diary_path),
+            self.github.get_file(rendered_path),
+        ]
+        if commit:
+            reads.append(self.github.get_file(transcript_path))
+        tree, existing_diary, existing_rendered, *rest = await asyncio.gather(*reads)
+        existing_transcript = rest[0] if rest else None
+        # 時刻で始まるエントリ名の順に並べる（移行分は必ず先頭になる）
+        blobs = sorted(
+            (item["path"], item["sha"]) for item in tree
+            if item["type"] == "blob" and item["path"].startswith(("entries/", "transcripts/"))
         )
+        if not blobs:
+            return None
         
-        # 2. STT生テキストを保存
-        if transcript_segments:
-            result["transcript_path"] = PathGenerator.transcript(date)
-            transcript_entry = self.generator.transcript_entry(conversation)
-            await self.save_or_append(
-                path=result["transcript_path"],
-                content=transcript_entry,
-                header=self.generator.transcript_header(date),
-                commit_message_new=f"📝 {date} のSTT生テキストを作成",
-                commit_message_update=f"📝 {date} のSTT生テキストを更新"
-            )
+        # 移行分は追記しかされず、古い内容は新しい内容の先頭に含まれるので一覧に入れない
+        legacy_name = f"{self.LEGACY_ENTRY_NAME}.md"
+        rendered = {p: sha for p, sha in blobs if not p.endswith(legacy_name)}
+        previous = orjson.loads(existing_rendered["content"]) if existing_rendered else {}
+        entry_count = sum(1 for p, _ in blobs if p.startswith("entries/"))
+        if not commit and existing_diary and entry_count and rendered == previous:
+            # 前回の再生成からエントリが変わっていない
+            return {
+                "date": date,
+                "diary_path": diary_path,
+                "diary_content": existing_diary["content"],
+                "transcript_path": None,
+                "entries": entry_count,
+            }
         
-        # 3. 生データJSONを保存
-        if conversation_id:
-            result["raw_data_path"] = PathGenerator.raw_data(date, conversation_id)
-            raw_json = json.dumps(conversation, ensure_ascii=False, indent=2, default=str)
-            await self.github.put_file(
-                result["raw_data_path"],
-                raw_json,
-                f"💾 {date} の会話生データを保存: {conversation_id[:8]}"
+        # 読むだけなら日記のエントリしか使わない
+        kinds = ("entries/", "transcripts/") if commit else ("entries/",)
+        blobs = [(p, sha) for p, sha in blobs if p.startswith(kinds)]
+        stale_blobs = [(p, sha) for p, sha in previous.items() if rendered.get(p) != sha and p.startswith(kinds)]
+        contents, stale_contents = await asyncio.gather(
+            asyncio.gather(*(self.github.get_blob(sha) for _, sha in blobs)),
+            asyncio.gather(*(self.github.get_blob(sha) for _, sha in stale_blobs))
+        )
+        day_dir = PathGenerator.day_dir(date)
+        entries = [(f"{day_dir}/{p}", c) for (p, _), c in zip(blobs, contents) if p.startswith("entries/")]
+        transcripts = [(f"{day_dir}/{p}", c) for (p, _), c in zip(blobs, contents) if p.startswith("transcripts/")]
+        stale_entries = [c for (p, _), c in zip(stale_blobs, stale_contents) if p.startswith("entries/")]
+        stale_transcripts = [c for (p, _), c in zip(stale_blobs, stale_contents) if p.startswith("transcripts/")]
+        
+        result = {
+            "date": date,
+            "diary_path": None,
+            "diary_content": None,
+            "transcript_path": None,
+            "entries": len(entries),
+        }
+        files: List[Tuple[str, str]] = []
+        if entries:
+            result["diary_path"] = diary_path
+            result["diary_content"] = self._rebuild_daily(
+                diary_path, self.generator.diary_header(date), entries, existing_diary,
+                PathGenerator.diary_entry(date, self.LEGACY_ENTRY_NAME), files, stale_entries
+            )
+        if transcripts:
+            result["transcript_path"] = transcript_path
+            self._rebuild_daily(
+                transcript_path, self.generator.transcript_header(date), transcripts, existing_transcript,
+                PathGenerator.transcript_entry(date, self.LEGACY_ENTRY_NAME), files, stale_transcripts
             )
         
+        if rendered != previous:
+            rendered_json = orjson.dumps(rendered, option=orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS)
+            files.append((rendered_path, rendered_json.decode("utf-8")))
+        
+        if files and commit:
+            # 移したエントリは次回の再生成で読み直すのでキャッシュしておく
+            legacy_paths = [path for path, _ in files if path not in (diary_path, transcript_path, rendered_path)]
+            await self._commit(files, f"📔 {date} の日記をまとめて更新", cached_paths=legacy_paths)
         return result
 
 
@@ -482,24 +985,125 @@ def render_home_page(config: Config) -> str:
 </html>"""
 
 
+@lru_cache(maxsize=2)
+def home_page_body(config: Config) -> bytes:
+    """ホームページHTML（設定ごとに1回だけ生成してエンコード済みで保持）"""
+    return render_home_page(config).encode("utf-8")
+
+
+@lru_cache(maxsize=2)
+def home_page_gzip(config: Config) -> bytes:
+    """gzip圧縮済みのホームページHTML（リクエストごとの圧縮を省く）"""
+    return gzip.compress(home_page_body(config), compresslevel=9, mtime=0)
+
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    """Accept-Encodingでgzipが受け入れられているか（q=0は拒否、gzipの指定は*より優先）"""
+    qualities: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        coding, *params = item.split(";")
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        qualities[coding.strip().lower()] = q
+    return qualities.get("gzip", qualities.get("*", 0.0)) > 0
+
+
 # ============================================
 # 依存性注入
 # ============================================
 
-async def get_github_client() -> GitHubClient:
-    """GitHubクライアントを取得"""
-    return GitHubClient(get_config())
+async def get_http_client(request: Request) -> httpx.AsyncClient:
+    """共有HTTPクライアントを取得
+    
+    通常はlifespanで生成済み。lifespanが実行されない環境（サーバーレスなど）
+    では最初のリクエストで生成し、以降のリクエストで使い回す。
+    閉じられていたら作り直し、古いクライアントに紐づく日記サービスも作り直させる。
+    プールした接続は生成したイベントループでしか使えないので、呼び出しごとに
+    ループを作り直す環境（@vercel/pythonなど）ではループが変わるたびに作り直す。
+    """
+    state = request.app.state
+    loop = asyncio.get_running_loop()
+    http = getattr(state, "http", None)
+    same_loop = getattr(state, "http_loop", None) is loop
+    if http is None or http.is_closed or not same_loop:
+        http = state.http = create_http_client(get_config())
+        state.http_loop = loop
+        old_service = getattr(state, "diary_service", None)
+        state.diary_service = None
+        if old_service is not None and same_loop:
+            # GitHubClientが代わりに自前で作ったクライアントがあれば閉じる
+            # （前のループのクライアントはそのループと一緒に使えなくなっている）
+            await old_service.github.close()
+    return http
 
 
-async def get_diary_service() -> DiaryService:
-    """日記サービスを取得"""
-    config = get_config()
-    github = GitHubClient(config)
-    dt_helper = DateTimeHelper(config.timezone)
-    generator = ContentGenerator(dt_helper)
+def create_diary_service(config: Config, http: httpx.AsyncClient) -> DiaryService:
+    """共有HTTPクライアントを使う日記サービスを生成"""
+    github = GitHubClient(config, http)
+    generator = ContentGenerator(DateTimeHelper(config.timezone))
     return DiaryService(github, generator)
 
 
+async def get_diary_service(
+    request: Request,
+    http: httpx.AsyncClient = Depends(get_http_client)
+) -> DiaryService:
+    """日記サービスを取得
+    
+    設定は起動後に変わらないので、アプリ全体で1つのサービスを使い回す。
+    lifespanが実行されない環境では最初のリクエストで生成する
+    （スレッドプールではなくイベントループ上で生成するためasyncにしている）。
+    """
+    service = getattr(request.app.state, "diary_service", None)
+    if service is None:
+        service = request.app.state.diary_service = create_diary_service(get_config(), http)
+    return service
+
+
+def get_github_client(
+    service: DiaryService = Depends(get_diary_service)
+) -> GitHubClient:
+    """GitHubクライアントを取得（日記サービスと共有）"""
+    return service.github
+
+
+async def read_limited_body(request: Request, limit: int = MAX_WEBHOOK_BODY_SIZE) -> bytearray:
+    """サイズ上限付きでリクエストボディを読み込む（超えたら413）"""
+    too_large = HTTPException(status_code=413, detail="リクエストが大きすぎます")
+    content_length = request.headers.get("content-length", "0")
+    if content_length.isdigit() and int(content_length) > limit:
+        raise too_large
+    
+    # Content-Lengthのないチャンク転送でも上限を超えた時点で打ち切る
+    body = bytearray()
+    async for chunk in request.stream():
+        body.extend(chunk)
+        if len(body) > limit:
+            raise too_large
+    return body
+
+
+def valid_date(date: str) -> str:
+    """パスの日付を検証（YYYY-MM-DD以外は400）
+    
+    fromisoformatは3.11以降20260115のような基本形式も受け付けるので、
+    正規の表記に戻して一致するかで確かめる。
+    """
+    try:
+        valid = _date.fromisoformat(date).isoformat() == date
+    except ValueError:
+        valid = False
+    if not valid:
+        raise HTTPException(status_code=400, detail=f"日付はYYYY-MM-DD形式で指定してください: {date}")
+    return date
+
+
 def require_config(config: Config = Depends(get_config)) -> Config:
     """設定が有効か検証"""
     if not config.is_configured:
@@ -518,50 +1122,81 @@ def require_config(config: Config = Depends(get_config)) -> Config:
 async def lifespan(app: FastAPI):
     """アプリケーションライフサイクル"""
     logger.info("Starting Omi GitHub Diary App")
+    config = get_config()
+    app.state.http = create_http_client(config)
+    app.state.http_loop = asyncio.get_running_loop()
+    app.state.diary_service = create_diary_service(config, app.state.http)
     yield
+    # 共有クライアントが途中で閉じられ、GitHubClientが自前で作り直した分も閉じる
+    if app.state.diary_service is not None:
+        await app.state.diary_service.github.close()
+    await app.state.http.aclose()
     logger.info("Shutting down Omi GitHub Diary App")
 
 
+class ORJSONResponse(JSONResponse):
+    """orjsonで直列化するJSONレスポンス（日本語もエスケープせずUTF-8のまま返す）"""
+    
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content)
+
+
 app = FastAPI(
     title="Omi GitHub日記",
     description="会話をGitHubに自動保存する日記アプリ",
     version="2.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 
+# 500バイト以上のレスポンスはgzipで返す（Content-Encoding設定済みのものはそのまま）
+app.add_middleware(GZipMiddleware, minimum_size=500, compresslevel=6)
+
+
 # ============================================
 # エンドポイント
 # ============================================
 
 @app.get("/", response_class=HTMLResponse)
-async def root():
+async def root(request: Request):
     """ホームページ"""
-    return render_home_page(get_config())
+    config = get_config()
+    headers = {"Cache-Control": "public, max-age=300", "Vary": "Accept-Encoding"}
+    if accepts_gzip(request.headers.get("accept-encoding", "")):
+        headers["Content-Encoding"] = "gzip"
+        return HTMLResponse(content=home_page_gzip(config), headers=headers)
+    return HTMLResponse(content=home_page_body(config), headers=headers)
 
 
 @app.post("/webhook")
 async def webhook(
     request: Request,
     uid: str = Query(None),
-    config: Config = Depends(require_config)
+    config: Config = Depends(require_config),
+    service: DiaryService = Depends(get_diary_service)
 ):
     """Omi External Integrationからのwebhook"""
+    # JSON以外はボディを読まずに拒否する（ヘッダーのない送信元は受け付ける）
+    content_type = request.headers.get("content-type", "")
+    if content_type and content_type.split(";", 1)[0].strip().lower() != "application/json":
+        raise HTTPException(status_code=415, detail="Content-Typeはapplication/jsonにしてください")
+    
+    raw_body = await read_limited_body(request)
     try:
-        body = await request.json()
-    except json.JSONDecodeError:
+        body = orjson.loads(raw_body)
+    except orjson.JSONDecodeError:
         raise HTTPException(status_code=400, detail="無効なJSONデータ")
     
     conversation = body if isinstance(body, dict) else {}
     
     # 日付を取得
-    dt_helper = DateTimeHelper(config.timezone)
+    dt_helper = service.generator.dt_helper
     created_at = conversation.get("created_at", "")
     dt = dt_helper.parse_iso(created_at) if created_at else dt_helper.now()
     date = dt_helper.format_date(dt)
     
     # 保存
-    service = await get_diary_service()
     result = await service.save_conversation(conversation, date)
     
     # URLを生成
@@ -583,7 +1218,10 @@ async def webhook(
 
 
 @app.get("/test")
-async def test_github(config: Config = Depends(get_config)):
+async def test_github(
+    config: Config = Depends(get_config),
+    github: GitHubClient = Depends(get_github_client)
+):
     """GitHub接続テスト"""
     if not config.is_configured:
         return {
@@ -593,51 +1231,113 @@ async def test_github(config: Config = Depends(get_config)):
             "github_repo": config.github_repo or "未設定"
         }
     
-    github = GitHubClient(config)
-    try:
-        repo_info = await github.get_repo_info()
-        if repo_info:
-            return {
-                "status": "ok",
-                "message": "✅ GitHubに正常に接続できました！",
-                "repository": repo_info.get("full_name"),
-                "private": repo_info.get("private"),
-                "url": repo_info.get("html_url")
-            }
+    repo_info = await github.get_repo_info()
+    if repo_info:
         return {
-            "status": "error",
-            "message": "❌ GitHubに接続できませんでした"
+            "status": "ok",
+            "message": "✅ GitHubに正常に接続できました！",
+            "repository": repo_info.get("full_name"),
+            "private": repo_info.get("private"),
+            "url": repo_info.get("html_url")
         }
-    finally:
-        await github.close()
+    return {
+        "status": "error",
+        "message": "❌ GitHubに接続できませんでした"
+    }
+
+
+@app.post("/diary/{date}/consolidate")
+async def consolidate_diary(
+    date: str = Depends(valid_date),
+    config: Config = Depends(require_config),
+    service: DiaryService = Depends(get_diary_service)
+):
+    """指定された日付のエントリから日記を再生成（夜間バッチなどから呼び出す）"""
+    result = await service.consolidate(date)
+    
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"{date} のエントリはまだありません")
+    
+    base_url = f"https://github.com/{config.github_repo}/blob/{config.github_branch}"
+    return {
+        "message": f"📔 {date} の日記を再生成しました！",
+        "date": date,
+        "entries": result["entries"],
+        "github_url": f"{base_url}/{result['diary_path']}" if result["diary_path"] else None,
+        "transcript_url": f"{base_url}/{result['transcript_path']}" if result["transcript_path"] else None,
+    }
+
+
+@app.get("/cron/consolidate")
+async def cron_consolidate(
+    request: Request,
+    config: Config = Depends(require_config),
+    service: DiaryService = Depends(get_diary_service)
+):
+    """前日までの日記を再生成（vercel.jsonのcronsから毎日呼び出す）
+    
+    CRON_SECRETが設定されていれば、VercelがAuthorizationヘッダーで送る値と照合する。
+    """
+    if config.cron_secret:
+        authorization = request.headers.get("authorization", "")
+        if not hmac.compare_digest(authorization, f"Bearer {config.cron_secret}"):
+            raise HTTPException(status_code=401, detail="認証に失敗しました")
+    
+    dt_helper = service.generator.dt_helper
+    today = dt_helper.now()
+    results = []
+    for days in range(1, CRON_CONSOLIDATE_DAYS + 1):
+        date = dt_helper.format_date(today - timedelta(days=days))
+        result = await service.consolidate(date)
+        results.append({"date": date, "entries": result["entries"] if result else 0})
+    
+    return {
+        "message": "📔 日記を再生成しました！",
+        "dates": results,
+    }
 
 
 @app.get("/diary/{date}")
-async def get_diary(date: str, config: Config = Depends(require_config)):
-    """指定された日付の日記を取得"""
-    github = GitHubClient(config)
-    try:
+async def get_diary(
+    date: str = Depends(valid_date),
+    config: Config = Depends(require_config),
+    service: DiaryService = Depends(get_diary_service)
+):
+    """指定された日付の日記を取得
+    
+    エントリから組み立てた最新の内容を返すが、リポジトリには書き込まない
+    （日ごとのファイルの更新は/cron/consolidateかconsolidateで行う）。
+    """
+    result = await service.consolidate(date, commit=False)
+    if result and result["diary_path"]:
+        file_path, content = result["diary_path"], result["diary_content"]
+    else:
+        # エントリのない日（エントリ方式より前の日など）は日記ファイルをそのまま返す
         file_path = PathGenerator.diary(date)
-        existing = await github.get_file(file_path)
-        
-        if existing:
-            return {
-                "date": date,
-                "content": existing["content"],
-                "github_url": f"https://github.com/{config.github_repo}/blob/{config.github_branch}/{file_path}"
-            }
-        raise HTTPException(status_code=404, detail=f"{date} の日記はまだありません")
-    finally:
-        await github.close()
+        existing = await service.github.get_file(file_path)
+        if not existing:
+            raise HTTPException(status_code=404, detail=f"{date} の日記はまだありません")
+        content = existing["content"]
+    
+    return {
+        "date": date,
+        "content": content,
+        "github_url": f"https://github.com/{config.github_repo}/blob/{config.github_branch}/{file_path}"
+    }
 
 
-@app.get("/health")
-async def health():
-    """ヘルスチェック"""
-    config = get_config()
-    return {
+@lru_cache(maxsize=2)
+def health_body(config: Config) -> bytes:
+    """ヘルスチェック応答（設定は起動時にしか変わらないので1回だけ直列化）"""
+    return orjson.dumps({
         "status": "ok",
         "github_configured": config.is_configured,
         "repository": config.github_repo,
-        "version": "2.0.0"
-    }
+        "version": app.version
+    })
+
+
+@app.get("/health")
+async def health():
+    """ヘルスチェック"""
+    return Response(content=health_body(get_config()), media_type="application/json")
@@ -0,0 +1,198 @@
+"""テスト共通設定（GitHub APIはhttpx.MockTransportのフェイクで置き換える）"""
+
+import hashlib
+import json
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+import pybase64
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+
+REPO = "o/r"
+BRANCH = "main"
+
+
+class FakeGitHub:
+    """テストで使うGitHub APIの部分実装
+
+    Contents API（取得のみ）・Git Data API（blob/tree/commit/ref）・branches APIを
+    メモリ上のコミット履歴で再現する。ref更新はfast-forwardのみ受け付ける。
+    """
+
+    def __init__(self):
+        self.blobs: Dict[str, bytes] = {}
+        self.trees: Dict[str, Dict[str, str]] = {}  # ツリーSHA -> {パス: blob SHA}
+        self.commits: Dict[str, Tuple[str, Optional[str], str]] = {}  # SHA -> (ツリー, 親, メッセージ)
+        self.requests: List[Tuple[str, str]] = []
+        # 差し込み用：Responseを返すとその応答で置き換える
+        self.intercept: Optional[Callable[[httpx.Request], Optional[httpx.Response]]] = None
+        self.head = self._commit(self._tree({}), None, "initial")
+
+    # ---- リポジトリの状態 ----
+
+    @staticmethod
+    def _sha(data: bytes) -> str:
+        return hashlib.sha1(data).hexdigest()
+
+    def _tree(self, files: Dict[str, str]) -> str:
+        sha = self._sha(json.dumps(sorted(files.items())).encode())
+        self.trees[sha] = dict(files)
+        return sha
+
+    def _commit(self, tree: str, parent: Optional[str], message: str) -> str:
+        sha = self._sha(f"{tree}:{parent}:{message}:{len(self.commits)}".encode())
+        self.commits[sha] = (tree, parent, message)
+        return sha
+
+    @property
+    def files(self) -> Dict[str, str]:
+        """ブランチ先頭のファイル（パス -> テキスト）"""
+        tree = self.trees[self.commits[self.head][0]]
+        return {path: self.blobs[sha].decode("utf-8") for path, sha in tree.items()}
+
+    @property
+    def history(self) -> List[str]:
+        """先頭から辿ったコミットメッセージ（新しい順、初期コミットは除く）"""
+        messages, sha = [], self.head
+        while self.commits[sha][1] is not None:
+            messages.append(self.commits[sha][2])
+            sha = self.commits[sha][1]
+        return messages
+
+    def seed(self, files: Dict[str, str], message: str = "seed"):
+        """既存ファイルを直接コミットする（旧形式のデータの再現用）"""
+        tree = dict(self.trees[self.commits[self.head][0]])
+        for path, text in files.items():
+            data = text.encode("utf-8")
+            self.blobs[self._sha(data)] = data
+            tree[path] = self._sha(data)
+        self.head = self._commit(self._tree(tree), self.head, message)
+
+    def count(self, method: str, pattern: str) -> int:
+        """条件に合うリクエスト数"""
+        return sum(1 for m, p in self.requests if m == method and re.fullmatch(pattern, p))
+
+    # ---- APIハンドラ ----
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append((request.method, request.url.path))
+        if self.intercept:
+            response = self.intercept(request)
+            if response is not None:
+                return response
+
+        method, path = request.method, request.url.path
+        prefix = f"/repos/{REPO}"
+        body = json.loads(request.content) if request.content else None
+
+        if method == "GET" and path == prefix:
+            return httpx.Response(200, json={
+                "full_name": REPO, "private": False, "html_url": f"https://github.com/{REPO}"
+            })
+        if method == "GET" and path == f"{prefix}/branches/{BRANCH}":
+            return httpx.Response(200, json={"name": BRANCH, "commit": {
+                "sha": self.head, "commit": {"tree": {"sha": self.commits[self.head][0]}}
+            }})
+        if method == "GET" and path.startswith(f"{prefix}/contents/"):
+            return self._get_contents(path[len(f"{prefix}/contents/"):], request)
+        if method == "POST" and path == f"{prefix}/git/blobs":
+            assert body["encoding"] == "utf-8"
+            data = body["content"].encode("utf-8")
+            self.blobs[self._sha(data)] = data
+            return httpx.Response(201, json={"sha": self._sha(data)})
+        if method == "GET" and path.startswith(f"{prefix}/git/blobs/"):
+            return httpx.Response(200, content=self.blobs[path.rsplit("/", 1)[1]])
+        if method == "GET" and path.startswith(f"{prefix}/git/trees/"):
+            tree = self.trees[path.rsplit("/", 1)[1]]
+            return httpx.Response(200, json={"truncated": False, "tree": [
+                {"path": p, "type": "blob", "sha": sha} for p, sha in sorted(tree.items())
+            ]})
+        if method == "POST" and path == f"{prefix}/git/trees":
+            tree = dict(self.trees[body["base_tree"]])
+            tree.update({item["path"]: item["sha"] for item in body["tree"]})
+            return httpx.Response(201, json={"sha": self._tree(tree)})
+        if method == "POST" and path == f"{prefix}/git/commits":
+            sha = self._commit(body["tree"], body["parents"][0], body["message"])
+            return httpx.Response(201, json={"sha": sha})
+        if method == "PATCH" and path == f"{prefix}/git/refs/heads/{BRANCH}":
+            if self.commits[body["sha"]][1] != self.head:
+                return httpx.Response(422, json={"message": "Update is not a fast forward"})
+            self.head = body["sha"]
+            return httpx.Response(200, json={"object": {"sha": self.head}})
+        return httpx.Response(500, json={"message": f"unhandled {method} {path}"})
+
+    def _get_contents(self, path: str, request: httpx.Request) -> httpx.Response:
+        tree = self.trees[self.commits[self.head][0]]
+        if path in tree:
+            sha = tree[path]
+            etag = f'"{sha}"'
+            if request.headers.get("if-none-match") == etag:
+                return httpx.Response(304, headers={"etag": etag})
+            return httpx.Response(200, headers={"etag": etag}, json={
+                "sha": sha, "content": pybase64.b64encode_as_string(self.blobs[sha])
+            })
+
+        # ディレクトリなら直下の一覧を返す（サブディレクトリはサブツリーのSHA付き）
+        children: Dict[str, Dict[str, Any]] = {}
+        for file_path, sha in tree.items():
+            if not file_path.startswith(path + "/"):
+                continue
+            name, _, rest = file_path[len(path) + 1:].partition("/")
+            if rest:
+                children.setdefault(name, {"name": name, "type": "dir", "files": {}})["files"][rest] = sha
+            else:
+                children[name] = {"name": name, "type": "file", "sha": sha}
+        if not children:
+            return httpx.Response(404, json={"message": "Not Found"})
+        for child in children.values():
+            if child["type"] == "dir":
+                child["sha"] = self._tree(child.pop("files"))
+        return httpx.Response(200, json=list(children.values()))
+
+
+@pytest.fixture
+def fake(monkeypatch) -> FakeGitHub:
+    monkeypatch.setenv("GITHUB_TOKEN", "test-token")
+    monkeypatch.setenv("GITHUB_REPO", REPO)
+    monkeypatch.setenv("GITHUB_BRANCH", BRANCH)
+    main.get_config.cache_clear()
+    main._head_cache.clear()
+    monkeypatch.setattr(main, "_file_cache", main.FileCache())
+    monkeypatch.setattr(main, "_blob_cache", main.BlobCache())
+
+    fake = FakeGitHub()
+    monkeypatch.setattr(main, "create_http_client", lambda config: httpx.AsyncClient(
+        base_url=config.github_api_url,
+        headers=main.github_headers(config),
+        transport=httpx.MockTransport(fake.handle)
+    ))
+    yield fake
+    main.get_config.cache_clear()
+
+
+@pytest.fixture
+def client(fake) -> TestClient:
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def make_conversation() -> Callable[..., Dict[str, Any]]:
+    """Omiのwebhookと同じ形の会話データを作る関数"""
+    def make(conversation_id: str, created_at: str, title: str = "会話", **extra) -> Dict[str, Any]:
+        conversation = {
+            "id": conversation_id,
+            "created_at": created_at,
+            "structured": {"title": title, "overview": f"{title}の概要", "category": "personal"},
+            "transcript_segments": [
+                {"text": f"{title}の発話", "speaker": "SPEAKER_00", "is_user": False, "start": 0, "end": 3}
+            ],
+        }
+        conversation.update(extra)
+        return conversation
+    return make
@@ -0,0 +1,106 @@
+"""アプリケーション全体の設定（共有クライアント・圧縮など）"""
+
+import asyncio
+
+import httpx
+
+import main
+
+
+def test_service_follows_replaced_http_client(client, fake, make_conversation):
+    old_http = main.app.state.http
+    client.portal.call(old_http.aclose)
+
+    assert client.post("/webhook", json=make_conversation("aaaaaaaa-1", "2026-01-15T01:00:00Z")).status_code == 200
+    http = main.app.state.http
+    assert http is not old_http and not http.is_closed
+    # サービスも新しい共有クライアントを使い、自前のクライアントは作らない
+    github = main.app.state.diary_service.github
+    assert github._client is http
+    assert not github._owns_client
+
+
+def test_service_is_reused_across_requests(client, fake, make_conversation):
+    service = main.app.state.diary_service
+    client.get("/test")
+    client.post("/webhook", json=make_conversation("aaaaaaaa-1", "2026-01-15T01:00:00Z"))
+    assert main.app.state.diary_service is service
+
+
+def test_home_page_is_served_pre_gzipped(client, fake):
+    response = client.get("/", headers={"accept-encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.content == main.home_page_body(main.get_config())
+    assert int(response.headers["content-length"]) == len(main.home_page_gzip(main.get_config()))
+
+
+def test_home_page_respects_refused_gzip(client, fake):
+    for accept_encoding in ("identity", "*;q=0", "br"):
+        response = client.get("/", headers={"accept-encoding": accept_encoding})
+        assert "content-encoding" not in response.headers
+        assert response.content == main.home_page_body(main.get_config())
+
+
+def test_accepts_gzip():
+    assert main.accepts_gzip("gzip")
+    assert main.accepts_gzip("deflate, GZIP;q=0.5")
+    assert main.accepts_gzip("*")
+    assert not main.accepts_gzip("")
+    assert not main.accepts_gzip("gzip; q=0.0")
+    assert not main.accepts_gzip("gzip;q=bad")
+
+
+def test_large_json_responses_are_compressed(client, fake, make_conversation):
+    client.post("/webhook", json=make_conversation("aaaaaaaa-1", "2026-01-15T01:00:00Z", title="長い会話" * 100))
+    response = client.get("/diary/2026-01-15", headers={"accept-encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "長い会話" in response.json()["content"]
+    # 小さい応答は圧縮しない
+    response = client.get("/health", headers={"accept-encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+
+
+def test_health_is_served_from_a_precomputed_body(client, fake):
+    main.health_body.cache_clear()
+    response = client.get("/health")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    assert response.json() == {
+        "status": "ok", "github_configured": True, "repository": "o/r", "version": main.app.version
+    }
+    client.get("/health")
+    assert main.health_body.cache_info().hits == 1
+    assert fake.requests == []
+
+
+def test_client_is_rebuilt_for_each_event_loop_without_lifespan(fake, make_conversation, monkeypatch):
+    for name in ("http", "http_loop", "diary_service"):
+        monkeypatch.setattr(main.app.state, name, None, raising=False)
+
+    async def call(conversation_id: str):
+        # ASGITransportはlifespanを実行しない（サーバーレスの呼び出しと同じ）
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://app") as client:
+            states = []
+            for created_at in ("2026-01-15T01:00:00Z", "2026-01-15T02:00:00Z"):
+                conversation = make_conversation(conversation_id, created_at)
+                assert (await client.post("/webhook", json=conversation)).status_code == 200
+                states.append((main.app.state.http, main.app.state.diary_service))
+        # 同じループの中では使い回す
+        assert states[0][0] is states[1][0] and states[0][1] is states[1][1]
+        return states[0]
+
+    seen = []
+    for conversation_id in ("aaaaaaaa-1", "bbbbbbbb-2"):
+        # 呼び出しごとに新しいイベントループで動かす
+        loop = asyncio.new_event_loop()
+        try:
+            seen.append(loop.run_until_complete(call(conversation_id)))
+        finally:
+            loop.close()
+    (first_http, first_service), (second_http, second_service) = seen
+    assert first_http is not second_http
+    assert first_service is not second_service
+    assert second_service.github._client is second_http
+    assert len(fake.history) == 4
@@ -0,0 +1,214 @@
+"""webhookでのエントリ保存と日ごとのファイルの再生成"""
+
+from datetime import timedelta, timezone
+from typing import Tuple
+
+import main
+
+
+DAY = "diary/2026/01/15"
+HEADER = "# 📔 2026年01月15日（木） の日記\n\n---\n\n"
+
+
+def test_webhook_then_consolidate(client, fake, make_conversation):
+    first = make_conversation("aaaaaaaa-1", "2026-01-15T01:00:00Z", title="朝")
+    second = make_conversation("bbbbbbbb-2", "2026-01-15T03:30:00Z", title="昼")
+
+    for conversation in (second, first):
+        response = client.post("/webhook", json=conversation)
+        assert response.status_code == 200
+    assert response.json()["file_path"] == f"{DAY}/entries/100000_aaaaaaaa-1.md"
+    # 1回のwebhookで日記・STT・生データを1コミットで書き、日ごとのファイルは触らない
+    assert fake.history == ["📝 2026-01-15 の日記を追加: aaaaaaaa", "📝 2026-01-15 の日記を追加: bbbbbbbb"]
+    assert f"{DAY}.md" not in fake.files
+    assert main.orjson.loads(fake.files[f"{DAY}/raw/aaaaaaaa-1.json"]) == first
+
+    response = client.post("/diary/2026-01-15/consolidate")
+    assert response.status_code == 200
+    assert response.json()["entries"] == 2
+
+    diary = fake.files[f"{DAY}.md"]
+    assert diary.startswith(HEADER)
+    assert diary.index("### 👤 朝") < diary.index("### 👤 昼")
+    transcript = fake.files[f"{DAY}_transcript.md"]
+    assert transcript.index("朝の発話") < transcript.index("昼の発話")
+
+
+def test_consolidate_without_changes_does_not_commit(client, fake, make_conversation):
+    client.post("/webhook", json=make_conversation("aaaaaaaa-1", "2026-01-15T01:00:00Z"))
+    assert client.post("/diary/2026-01-15/consolidate").status_code == 200
+    commits = len(fake.history)
+
+    assert client.post("/diary/2026-01-15/consolidate").status_code == 200
+    assert len(fake.history) == commits
+
+
+def test_consolidate_keeps_legacy_daily_content(client, fake, make_conversation):
+    # エントリ方式より前に追記されていた日記
+    legacy = HEADER + "\n### 💬 以前の会話\n\n本文\n\n---\n"
+    fake.seed({f"{DAY}.md": legacy, f"{DAY}_transcript.md": "# OLD transcript\n"})
+    client.post("/webhook", json=make_conversation("aaaaaaaa-1", "2026-01-15T01:00:00Z", title="新しい会話"))
+
+    assert client.post("/diary/2026-01-15/consolidate").status_code == 200
+    diary = fake.files[f"{DAY}.md"]
+    assert diary.startswith(legacy)
+    assert diary.index("以前の会話") < diary.index("新しい会話")
+    assert "# OLD transcript" in fake.files[f"{DAY}_transcript.md"]
+    assert f"{DAY}/entries/000000-legacy.md" in fake.files
+    assert f"{DAY}/transcripts/000000-legacy.md" in fake.files
+
+    # 移した内容は二重にならず、再実行してもコミットされない
+    commits = len(fake.history)
+    assert client.post("/diary/2026-01-15/consolidate").status_code == 200
+    assert len(fake.history) == commits
+    assert fake.files[f"{DAY}.md"].count("以前の会話") == 1
+
+
+def test_consolidate_keeps_text_added_after_migration(client, fake, make_conversation):
+    client.post("/webhook", json=make_conversation("aaaaaaaa-1", "2026-01-15T01:00:00Z"))
+    fake.seed({f"{DAY}.md": "# OLD content\n"})
+    client.post("/diary/2026-01-15/consolidate")
+
+    # GitHub上で日記に直接書き足された分も残す
+    fake.seed({f"{DAY}.md": fake.files[f"{DAY}.md"] + "\n手で追記したメモ\n"})
+    client.post("/diary/2026-01-15/consolidate")
+    diary = fake.files[f"{DAY}.md"]
+    assert diary.count("# OLD content") == 1
+    assert diary.count("手で追記したメモ") == 1
+
+
+def test_consolidate_without_entries_is_404(client, fake):
+    fake.seed({f"{DAY}.md": "# OLD content\n"})
+    assert client.post("/diary/2026-01-15/consolidate").status_code == 404
+    assert fake.files[f"{DAY}.md"] == "# OLD content\n"
+
+
+def test_resent_webhook_does_not_add_empty_commit(client, fake, make_conversation):
+    conversation = make_conversation("aaaaaaaa-1", "2026-01-15T01:00:00Z")
+    assert client.post("/webhook", json=conversation).status_code == 200
+    assert client.post("/webhook", json=conversation).status_code == 200
+    assert len(fake.history) == 1
+    assert fake.count("POST", r".*/git/commits") == 1
+
+
+def test_invalid_dates_are_rejected(client, fake):
+    for date in ("2026-01-15xyz", "2026-13-45", "20260115", "2026-W03-4"):
+        assert client.post(f"/diary/{date}/consolidate").status_code == 400
+        assert client.get(f"/diary/{date}").status_code == 400
+    assert fake.requests == []
+
+
+def test_get_diary_shows_new_entries_without_committing(client, fake, make_conversation):
+    client.post("/webhook", json=make_conversation("aaaaaaaa-1", "2026-01-15T01:00:00Z", title="朝"))
+    commits = len(fake.history)
+    response = client.get("/diary/2026-01-15")
+    assert response.status_code == 200
+    assert "### 👤 朝" in response.json()["content"]
+    # 読むだけではリポジトリに書き込まない
+    assert len(fake.history) == commits
+    assert f"{DAY}.md" not in fake.files
+
+    client.post("/diary/2026-01-15/consolidate")
+    client.post("/webhook", json=make_conversation("bbbbbbbb-2", "2026-01-15T03:30:00Z", title="昼"))
+    commits = len(fake.history)
+    content = client.get("/diary/2026-01-15").json()["content"]
+    assert "### 👤 昼" in content
+    assert "### 👤 昼" not in fake.files[f"{DAY}.md"]
+    assert len(fake.history) == commits
+
+
+def test_get_diary_returns_legacy_file_and_404(client, fake):
+    fake.seed({f"{DAY}.md": "# OLD content\n"})
+    response = client.get("/diary/2026-01-15")
+    assert response.status_code == 200
+    assert response.json()["content"] == "# OLD content\n"
+    assert client.get("/diary/2026-01-16").status_code == 404
+
+
+def test_conversations_without_id_in_the_same_second_are_kept(client, fake, make_conversation):
+    for title in ("A", "B"):
+        response = client.post("/webhook", json=make_conversation("", "2026-01-15T01:00:00Z", title=title))
+        assert response.status_code == 200
+    entries = [path for path in fake.files if path.startswith(f"{DAY}/entries/")]
+    assert len(entries) == 2
+
+    content = client.get("/diary/2026-01-15").json()["content"]
+    assert "### 👤 A" in content
+    assert "### 👤 B" in content
+
+
+def test_resent_conversation_replaces_its_old_text(client, fake, make_conversation):
+    client.post("/webhook", json=make_conversation("aaaaaaaa-1", "2026-01-15T01:00:00Z", title="朝"))
+    assert client.post("/diary/2026-01-15/consolidate").status_code == 200
+
+    # Omiが同じ会話を内容を変えて送り直した
+    changed = make_conversation("aaaaaaaa-1", "2026-01-15T01:00:00Z", title="朝")
+    changed["structured"]["overview"] = "書き直した概要"
+    client.post("/webhook", json=changed)
+    assert client.post("/diary/2026-01-15/consolidate").status_code == 200
+
+    diary = fake.files[f"{DAY}.md"]
+    assert diary.count("### 👤 朝") == 1
+    assert "書き直した概要" in diary
+    assert "朝の概要" not in diary
+    assert f"{DAY}/entries/000000-legacy.md" not in fake.files
+
+
+def yesterday_in_jst(hour: int) -> Tuple[str, str]:
+    """JSTの前日の日付と、その日のhour時（JST）のcreated_at"""
+    dt = main.DateTimeHelper().now() - timedelta(days=1)
+    dt = dt.replace(hour=hour, minute=0, second=0, microsecond=0)
+    return dt.strftime("%Y-%m-%d"), dt.astimezone(timezone.utc).isoformat()
+
+
+def test_cron_rebuilds_previous_days(client, fake, make_conversation):
+    date, created_at = yesterday_in_jst(10)
+    client.post("/webhook", json=make_conversation("aaaaaaaa-1", created_at, title="昨日"))
+
+    response = client.get("/cron/consolidate")
+    assert response.status_code == 200
+    assert {"date": date, "entries": 1} in response.json()["dates"]
+    assert len(response.json()["dates"]) == main.CRON_CONSOLIDATE_DAYS
+    assert "### 👤 昨日" in fake.files[main.PathGenerator.diary(date)]
+
+
+def test_cron_checks_the_secret(client, fake, monkeypatch):
+    monkeypatch.setenv("CRON_SECRET", "s3cret")
+    main.get_config.cache_clear()
+    assert client.get("/cron/consolidate").status_code == 401
+    assert client.get("/cron/consolidate", headers={"authorization": "Bearer wrong"}).status_code == 401
+    assert fake.requests == []
+    assert client.get("/cron/consolidate", headers={"authorization": "Bearer s3cret"}).status_code == 200
+
+
+def cold_start(fake, monkeypatch):
+    """別のプロセスで読むのと同じ状態にする（キャッシュを空にして記録を消す）"""
+    monkeypatch.setattr(main, "_file_cache", main.FileCache())
+    monkeypatch.setattr(main, "_blob_cache", main.BlobCache())
+    fake.requests.clear()
+
+
+def test_get_diary_returns_current_file_without_reading_entries(client, fake, make_conversation, monkeypatch):
+    for i in range(5):
+        client.post("/webhook", json=make_conversation(f"{i:08d}-x", f"2026-01-15T0{i}:00:00Z"))
+    client.post("/diary/2026-01-15/consolidate")
+    cold_start(fake, monkeypatch)
+
+    response = client.get("/diary/2026-01-15")
+    assert response.json()["content"] == fake.files[f"{DAY}.md"]
+    # ツリー2回・日記・rendered.jsonだけ読む
+    assert len(fake.requests) == 4
+    assert fake.count("GET", r".*/git/blobs/.*") == 0
+    assert fake.count("GET", r".*_transcript\.md") == 0
+
+
+def test_get_diary_skips_transcripts_when_rebuilding(client, fake, make_conversation, monkeypatch):
+    client.post("/webhook", json=make_conversation("aaaaaaaa-1", "2026-01-15T01:00:00Z", title="朝"))
+    client.post("/diary/2026-01-15/consolidate")
+    client.post("/webhook", json=make_conversation("bbbbbbbb-2", "2026-01-15T03:30:00Z", title="昼"))
+    cold_start(fake, monkeypatch)
+
+    content = client.get("/diary/2026-01-15").json()["content"]
+    assert "### 👤 朝" in content and "### 👤 昼" in content
+    assert fake.count("GET", r".*/git/blobs/.*") == 2
+    assert fake.count("GET", r".*_transcript\.md") == 0
@@ -0,0 +1,40 @@
+"""日時変換とMarkdownの生成"""
+
+import main
+
+
+def test_parse_iso_accepts_trailing_z():
+    helper = main.DateTimeHelper()
+    assert helper.parse_iso("2026-01-15T01:00:00Z") == helper.parse_iso("2026-01-15T01:00:00+00:00")
+    assert helper.format_datetime(helper.parse_iso("2026-01-15T01:00:00Z")) == "2026-01-15 10:00:00"
+    assert helper.format_datetime(helper.parse_iso("2026-01-15T01:00:00.123456Z")) == "2026-01-15 10:00:00"
+
+
+def test_zone_without_dst_uses_a_fixed_offset():
+    helper = main.DateTimeHelper("Asia/Tokyo")
+    assert helper._local_tz == main.timezone(main.timedelta(hours=9))
+    assert helper.format_datetime(helper.parse_iso("2026-07-01T15:30:00Z")) == "2026-07-02 00:30:00"
+
+
+def test_zone_with_dst_keeps_the_zoneinfo():
+    helper = main.DateTimeHelper("America/New_York")
+    assert helper._local_tz is helper.tz
+    assert helper.format_time(helper.parse_iso("2026-01-15T12:00:00Z")) == "07:00"
+    assert helper.format_time(helper.parse_iso("2026-07-15T12:00:00Z")) == "08:00"
+
+
+def test_diary_header_is_memoized_per_date():
+    main._diary_header_for.cache_clear()
+    generator = main.ContentGenerator(main.DateTimeHelper())
+    header = generator.diary_header("2026-01-15")
+    assert generator.diary_header("2026-01-15") is header
+    assert main._diary_header_for.cache_info().hits == 1
+    assert generator.diary_header("2026-01-16") != header
+
+
+def test_diary_header_formats_the_date_in_japanese():
+    generator = main.ContentGenerator(main.DateTimeHelper())
+    assert generator.diary_header("2026-01-15") == "# 📔 2026年01月15日（木） の日記\n\n---\n\n"
+    assert generator.diary_header("2026-01-18").startswith("# 📔 2026年01月18日（日）")
+    # 解釈できない日付はそのまま見出しにする
+    assert generator.diary_header("2026-02-30") == "# 📔 2026-02-30 の日記\n\n---\n\n"
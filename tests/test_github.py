@@ -0,0 +1,145 @@
+"""GitHubへの書き込み（Git Data APIのコミット・競合時の再試行・先頭キャッシュ）"""
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+
+@pytest.fixture
+def webhook(client, make_conversation):
+    """会話IDだけ指定してwebhookを送る関数"""
+    def post(conversation_id: str, created_at: str = "2026-01-15T01:00:00Z"):
+        return client.post("/webhook", json=make_conversation(conversation_id, created_at))
+    return post
+
+
+def test_webhook_writes_all_files_in_one_commit(client, fake, webhook):
+    assert webhook("aaaaaaaa-1").status_code == 200
+    assert fake.history == ["📝 2026-01-15 の日記を追加: aaaaaaaa"]
+    assert sorted(fake.files) == [
+        "diary/2026/01/15/entries/100000_aaaaaaaa-1.md",
+        "diary/2026/01/15/raw/aaaaaaaa-1.json",
+        "diary/2026/01/15/transcripts/100000_aaaaaaaa-1.md",
+    ]
+    assert fake.count("PUT", r".*") == 0
+
+
+def test_head_is_cached_between_commits(client, fake, webhook):
+    webhook("aaaaaaaa-1")
+    webhook("bbbbbbbb-2")
+    assert len(fake.history) == 2
+    assert fake.count("GET", r".*/branches/main") == 1
+
+
+def test_conflict_is_retried_with_a_fresh_head(client, fake, webhook):
+    webhook("aaaaaaaa-1")
+    # 別のプロセスがブランチを進めたのでキャッシュした先頭が古くなる
+    fake.seed({"notes.md": "外部からの更新"}, message="external")
+
+    assert webhook("bbbbbbbb-2").status_code == 200
+    assert fake.history == ["📝 2026-01-15 の日記を追加: bbbbbbbb", "external", "📝 2026-01-15 の日記を追加: aaaaaaaa"]
+    assert fake.files["notes.md"] == "外部からの更新"
+    assert fake.count("PATCH", r".*/git/refs/heads/main") == 3
+    assert fake.count("GET", r".*/branches/main") == 2
+
+
+def test_repeated_conflict_is_raised(client, fake, webhook):
+    fake.intercept = lambda request: (
+        httpx.Response(422, json={"message": "Update is not a fast forward"})
+        if request.method == "PATCH" else None
+    )
+    with pytest.raises(main.GitHubConflictError):
+        webhook("aaaaaaaa-1")
+    assert fake.count("PATCH", r".*") == 2
+    assert fake.history == []
+    # 失敗後は先頭のキャッシュを捨てて、次回は取得し直す
+    assert main._head_cache == {}
+
+
+def fail_first(method: str, response_or_error):
+    """最初に一致したリクエストだけ失敗させる差し込み"""
+    state = {"done": False}
+
+    def intercept(request):
+        if request.method != method or state["done"]:
+            return None
+        state["done"] = True
+        if isinstance(response_or_error, Exception):
+            raise response_or_error
+        return response_or_error
+    return intercept
+
+
+def test_rate_limited_request_is_retried(client, fake, webhook):
+    fake.intercept = fail_first("POST", httpx.Response(429, headers={"retry-after": "0"}))
+    assert webhook("aaaaaaaa-1").status_code == 200
+    assert len(fake.history) == 1
+    assert fake.count("POST", r".*/git/blobs") == 4  # 3ファイル + 再試行1回
+
+
+def test_forbidden_without_rate_limit_is_not_retried(client, fake):
+    fake.intercept = lambda request: httpx.Response(403, json={"message": "Forbidden"})
+    assert client.get("/test").json()["status"] == "error"
+    assert fake.count("GET", r"/repos/o/r") == 1
+
+
+def test_long_rate_limit_wait_is_not_retried(client, fake):
+    reset = str(int(main.datetime.now(main.timezone.utc).timestamp()) + 3600)
+    fake.intercept = lambda request: httpx.Response(
+        403, headers={"x-ratelimit-remaining": "0", "x-ratelimit-reset": reset}
+    )
+    assert client.get("/test").json()["status"] == "error"
+    assert fake.count("GET", r"/repos/o/r") == 1
+
+
+def test_dropped_connection_is_resent(client, fake, webhook):
+    fake.intercept = fail_first("PATCH", httpx.RemoteProtocolError("Server disconnected"))
+    assert webhook("aaaaaaaa-1").status_code == 200
+    assert len(fake.history) == 1
+    assert fake.count("PATCH", r".*") == 2
+
+
+def test_persistent_disconnect_is_raised(client, fake, monkeypatch):
+    monkeypatch.setattr(main, "MAX_TRANSIENT_RETRIES", 1)
+
+    def intercept(request):
+        raise httpx.ReadError("connection reset")
+    fake.intercept = intercept
+    assert client.get("/test").json()["status"] == "error"
+    assert fake.count("GET", r"/repos/o/r") == 2
+
+
+def test_concurrent_saves_work_on_each_event_loop(fake, make_conversation):
+    async def save_many():
+        service = main.app.state.diary_service
+        conversations = [
+            make_conversation(f"{i:08d}-x", f"2026-01-15T0{i}:00:00Z")
+            for i in range(main.MAX_CONCURRENT_REQUESTS + 1)
+        ]
+        await main.asyncio.gather(*(service.save_conversation(c, "2026-01-15") for c in conversations))
+
+    # TestClientはセッションごとに別のイベントループで動く
+    for _ in range(2):
+        with TestClient(main.app) as client:
+            client.portal.call(save_many)
+    # 2回目は同じ内容なのでコミットされない
+    assert len(fake.history) == main.MAX_CONCURRENT_REQUESTS + 1
+
+
+def test_file_cache_evicts_least_recently_used_beyond_the_limit():
+    cache = main.FileCache(max_chars=10)
+    cache.put("a.md", main.CachedFile("aaaa", "sha-a", None))
+    cache.put("b.md", main.CachedFile("bbbb", "sha-b", None))
+    assert cache.get("a.md").sha == "sha-a"
+    cache.put("c.md", main.CachedFile("cccc", "sha-c", None))
+    assert cache.get("b.md") is None
+    assert cache.get("a.md") is not None and cache.get("c.md") is not None
+
+    # 上書きしても合計が二重に数えられない
+    cache.put("c.md", main.CachedFile("cc", "sha-c2", None))
+    assert cache.get("a.md") is not None
+    # 上限より大きいファイルはキャッシュしない
+    cache.put("big.md", main.CachedFile("x" * 11, "sha-big", None))
+    assert cache.get("big.md") is None
@@ -0,0 +1,40 @@
+"""webhookの入力チェック（ボディサイズの上限・Content-Type）"""
+
+import main
+
+
+def test_body_over_limit_is_413(client, fake):
+    body = b"{" + b" " * main.MAX_WEBHOOK_BODY_SIZE + b"}"
+    response = client.post("/webhook", content=body, headers={"content-type": "application/json"})
+    assert response.status_code == 413
+    assert fake.requests == []
+
+
+def test_chunked_body_over_limit_is_413(client, fake):
+    def chunks():
+        chunk = b" " * 1_000_000
+        for _ in range(main.MAX_WEBHOOK_BODY_SIZE // len(chunk) + 1):
+            yield chunk
+    response = client.post("/webhook", content=chunks(), headers={"content-type": "application/json"})
+    assert response.status_code == 413
+    assert fake.requests == []
+
+
+def test_invalid_json_is_400(client, fake):
+    response = client.post("/webhook", content=b"{", headers={"content-type": "application/json"})
+    assert response.status_code == 400
+    assert fake.requests == []
+
+
+def test_non_json_content_type_is_415(client, fake):
+    for content_type in ("text/plain", "application/x-www-form-urlencoded", "application/jsonp"):
+        response = client.post("/webhook", content=b"{}", headers={"content-type": content_type})
+        assert response.status_code == 415
+    assert fake.requests == []
+
+
+def test_json_content_type_variants_are_accepted(client, fake):
+    for content_type in ("application/json; charset=utf-8", "Application/JSON", None):
+        headers = {"content-type": content_type} if content_type else {}
+        response = client.post("/webhook", content=b"{", headers=headers)
+        assert response.status_code == 400